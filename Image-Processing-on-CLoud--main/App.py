@@ -3,10 +3,9 @@ import os
 import threading
 import time
 import signal
-from azure.storage.blob import BlobServiceClient
-from azure.storage.queue import QueueServiceClient
 from werkzeug.utils import secure_filename
 import logging
+import backends
 
 app = Flask(__name__)
 UPLOAD_FOLDER = 'uploads'
@@ -18,14 +17,10 @@ IMAGE_CONTAINER_NAME = "myone"
 RESULT_CONTAINER_NAME = "myresult"
 QUEUE_NAME = 'taskqueue'
 
-# Initialize Azure Blob Service Client
-blob_service_client = BlobServiceClient.from_connection_string(AZURE_CONNECTION_STRING)
-image_container_client = blob_service_client.get_container_client(IMAGE_CONTAINER_NAME)
-result_container_client = blob_service_client.get_container_client(RESULT_CONTAINER_NAME)
-
-# Initialize Azure Queue Service Client
-queue_service_client = QueueServiceClient.from_connection_string(AZURE_CONNECTION_STRING)
-task_queue_client = queue_service_client.get_queue_client(QUEUE_NAME)
+# Initialize Blob and Queue clients (Azure unless STORAGE_BACKEND selects a local stand-in)
+image_container_client = backends.get_container_client(AZURE_CONNECTION_STRING, IMAGE_CONTAINER_NAME)
+result_container_client = backends.get_container_client(AZURE_CONNECTION_STRING, RESULT_CONTAINER_NAME)
+task_queue_client = backends.get_queue_client(AZURE_CONNECTION_STRING, QUEUE_NAME)
 
 # Configure logging for your application
 logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -132,14 +127,13 @@ def add_result():
     result = data.get('result')
     if result:
         # Assuming result is in the format "filename,operation,url"
-        result_parts = result.split(',')
+        result_parts = result.split(',', 2)
         if len(result_parts) == 3:
-            result_name_operation = f"{result_parts[0]}, {result_parts[1]}"
-            with results_lock:
-                results.append(result_name_operation)
+            entry = {'filename': result_parts[0], 'operation': result_parts[1], 'url': result_parts[2]}
         else:
-            with results_lock:
-                results.append(result)
+            entry = {'filename': None, 'operation': None, 'url': result}
+        with results_lock:
+            results.append(entry)
     return jsonify({'message': 'Result added'}), 200
 
 @app.route('/results')
@@ -147,6 +141,11 @@ def results_page():
     with results_lock:
         return render_template('results.html', results=results)
 
+@app.route('/results_json', methods=['GET'])
+def get_results():
+    with results_lock:
+        return jsonify(results)
+
 def continuous_task_fetch(stop_event):
     while not stop_event.is_set():
         tasks_fetched = fetch_tasks_from_azure_queue()
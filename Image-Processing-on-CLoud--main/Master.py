@@ -5,21 +5,26 @@ import requests
 import atexit
 import time
 import signal
-from azure.storage.queue import QueueServiceClient
+import os
+import backends
 
 # Define server address and port
 server_address = '0.0.0.0'  # Listen on all available interfaces
-server_port = 5000
+server_port = int(os.environ.get('MASTER_PORT', 5000))
 
 # Azure Queue Storage settings
 connection_string = "_____________"
 queue_name = 'taskqueue'
-queue_service_client = QueueServiceClient.from_connection_string(connection_string)
-task_queue_client = queue_service_client.get_queue_client(queue_name)
+task_queue_client = backends.get_queue_client(connection_string, queue_name)
 
-flask_server_url = 'http://localhost:5001/status'
-flask_add_result_url = 'http://localhost:5001/add_result'
-flask_clear_all_url = 'http://localhost:5001/clear_all'
+flask_url = os.environ.get('FLASK_URL', 'http://localhost:5001')
+flask_server_url = f'{flask_url}/status'
+flask_add_result_url = f'{flask_url}/add_result'
+flask_clear_all_url = f'{flask_url}/clear_all'
+
+# Polling intervals in seconds
+fetch_interval = float(os.environ.get('FETCH_INTERVAL', 10))
+idle_interval = float(os.environ.get('IDLE_INTERVAL', 5))
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -113,7 +118,7 @@ def handle_worker_connection(worker_socket, address):
                         with results_lock:
                             results.append(result)
                         logging.info(f"Task {task[0]}, {task[1]} completed by worker {worker_id} with result {result}")
-                        add_result(result)  # Add result to Flask server
+                        add_result(f"{task[0]},{task[1]},{result}")  # Add result to Flask server
                         with assigned_tasks_lock:
                             assigned_tasks.pop(worker_id, None)  # Remove from assigned tasks
                     else:
@@ -129,7 +134,7 @@ def handle_worker_connection(worker_socket, address):
             else:
                 logging.info("No tasks in queue, sending NO_TASK signal to worker")
                 worker_socket.sendall("NO_TASK".encode())  # Send "no task" signal to the worker
-                time.sleep(5)  # Wait before checking the queue again
+                time.sleep(idle_interval)  # Wait before checking the queue again
     except (ConnectionResetError, ConnectionAbortedError, BrokenPipeError, ValueError) as e:
         logging.error(f"Connection to worker {worker_id} lost or task error: {e}")
         if worker_id in assigned_tasks:
@@ -199,7 +204,7 @@ def continuous_task_fetch():
         tasks_fetched = fetch_tasks_from_azure_queue()
         if tasks_fetched > 0:
             logging.info("New tasks fetched and queued")
-        time.sleep(10)  # Check for new tasks every 10 seconds
+        time.sleep(fetch_interval)  # Check for new tasks every 10 seconds by default
 
 # Start continuously fetching tasks in a separate thread
 task_fetch_thread = threading.Thread(target=continuous_task_fetch)
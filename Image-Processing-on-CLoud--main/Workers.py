@@ -2,10 +2,18 @@ import socket
 import subprocess
 import logging
 import time
+import os
+import sys
 
 # Define master address and port
-master_address = '20.163.175.53'  # Master VM IP address
-master_port = 5000
+master_address = os.environ.get('MASTER_ADDRESS', '20.163.175.53')  # Master VM IP address
+master_port = int(os.environ.get('MASTER_PORT', 5000))
+
+# Seconds to wait after a NO_TASK signal before reading from the master again
+idle_interval = float(os.environ.get('IDLE_INTERVAL', 5))
+
+# Resolve the processing script next to this file so workers can run from any directory
+img_processing_script = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'img_processing.py')
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -25,9 +33,9 @@ def connect_to_master():
 def execute_task(task_args):
     try:
         if task_args[1] == "feature_matching":
-            cmd = ["python3", "img_processing.py", task_args[1], task_args[0], task_args[2]]
+            cmd = [sys.executable, img_processing_script, task_args[1], task_args[0], task_args[2]]
         else:
-            cmd = ["python3", "img_processing.py", task_args[1], task_args[0]]
+            cmd = [sys.executable, img_processing_script, task_args[1], task_args[0]]
         result = subprocess.run(cmd, capture_output=True, text=True)
         if result.returncode == 0:
             return result.stdout.strip()
@@ -49,7 +57,7 @@ def main():
                     continue
                 if task_data == "NO_TASK":
                     logging.info("No tasks available, waiting for new tasks...")
-                    time.sleep(5)  # Wait before checking again
+                    time.sleep(idle_interval)  # Wait before checking again
                     continue
                 logging.info(f"Received task: {task_data}")
                 task_args = task_data.split(',')
@@ -0,0 +1,226 @@
+import os
+import time
+import uuid
+import threading
+from pathlib import Path
+
+# Storage backend selection: "azure" (default), "local" (filesystem, shared
+# between processes) or "memory" (in-process only, useful with Flask's test client)
+STORAGE_BACKEND = os.environ.get('STORAGE_BACKEND', 'azure').lower()
+# Defaults to a directory next to this file so processes started from different
+# working directories still share it
+LOCAL_STORAGE_DIR = os.environ.get('LOCAL_STORAGE_DIR',
+                                   os.path.join(os.path.dirname(os.path.abspath(__file__)), 'local_storage'))
+
+# Azure hides a received message for 30 seconds unless it is deleted first
+DEFAULT_VISIBILITY_TIMEOUT = 30
+
+
+class QueueMessage:
+    def __init__(self, id, content, pop_receipt):
+        self.id = id
+        self.content = content
+        self.pop_receipt = pop_receipt
+
+
+class BlobDownloader:
+    def __init__(self, data):
+        self._data = data
+
+    def readall(self):
+        return self._data
+
+
+def _read_data(data):
+    if hasattr(data, 'read'):
+        data = data.read()
+    if isinstance(data, str):
+        data = data.encode()
+    return data
+
+
+# Filesystem stand-ins. Every message and blob is a file under LOCAL_STORAGE_DIR,
+# so the App, the Master and img_processing.py can share them across processes.
+class LocalQueueClient:
+    def __init__(self, root, queue_name):
+        self.queue_name = queue_name
+        self.queue_dir = os.path.join(root, 'queues', queue_name)
+        self.tmp_dir = os.path.join(root, 'tmp')
+        os.makedirs(self.queue_dir, exist_ok=True)
+        os.makedirs(self.tmp_dir, exist_ok=True)
+
+    def send_message(self, content):
+        # File names are "<message id>.<visible at, ns>"; ids sort in send order
+        message_id = f"{time.time_ns():020d}-{uuid.uuid4().hex[:8]}"
+        tmp_path = os.path.join(self.tmp_dir, uuid.uuid4().hex)
+        with open(tmp_path, 'w') as f:
+            f.write(content)
+        os.rename(tmp_path, os.path.join(self.queue_dir, f"{message_id}.0"))
+        return QueueMessage(message_id, content, f"{message_id}.0")
+
+    def receive_messages(self, messages_per_page=None, visibility_timeout=None, max_messages=None):
+        if visibility_timeout is None:
+            visibility_timeout = DEFAULT_VISIBILITY_TIMEOUT
+        messages = []
+        now = time.time_ns()
+        for name in sorted(os.listdir(self.queue_dir)):
+            if max_messages is not None and len(messages) >= max_messages:
+                break
+            message_id, _, visible_at = name.rpartition('.')
+            if int(visible_at) > now:
+                continue
+            pop_receipt = f"{message_id}.{now + int(visibility_timeout * 1e9)}"
+            try:
+                # Renaming claims the message; a concurrent receiver gets FileNotFoundError
+                os.rename(os.path.join(self.queue_dir, name), os.path.join(self.queue_dir, pop_receipt))
+            except FileNotFoundError:
+                continue
+            try:
+                with open(os.path.join(self.queue_dir, pop_receipt)) as f:
+                    messages.append(QueueMessage(message_id, f.read(), pop_receipt))
+            except FileNotFoundError:
+                # Our claim expired and another receiver took the message first
+                continue
+        return messages
+
+    def delete_message(self, message, pop_receipt=None):
+        os.remove(os.path.join(self.queue_dir, pop_receipt or message.pop_receipt))
+
+
+class LocalBlobClient:
+    def __init__(self, container_dir, tmp_dir, blob_name):
+        self.blob_name = blob_name
+        self.path = os.path.realpath(os.path.join(container_dir, blob_name))
+        # Reject names like "../x" that would resolve outside the container
+        if not self.path.startswith(os.path.realpath(container_dir) + os.sep):
+            raise ValueError(f"Invalid blob name {blob_name!r}")
+        self.tmp_dir = tmp_dir
+        self.url = Path(os.path.abspath(self.path)).as_uri()
+
+    def upload_blob(self, data, overwrite=False):
+        if not overwrite and os.path.exists(self.path):
+            raise FileExistsError(f"Blob {self.blob_name} already exists")
+        tmp_path = os.path.join(self.tmp_dir, uuid.uuid4().hex)
+        with open(tmp_path, 'wb') as f:
+            f.write(_read_data(data))
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        os.replace(tmp_path, self.path)
+
+    def download_blob(self):
+        with open(self.path, 'rb') as f:
+            return BlobDownloader(f.read())
+
+
+class LocalContainerClient:
+    def __init__(self, root, container_name):
+        self.container_name = container_name
+        self.container_dir = os.path.join(root, 'containers', container_name)
+        self.tmp_dir = os.path.join(root, 'tmp')
+        os.makedirs(self.container_dir, exist_ok=True)
+        os.makedirs(self.tmp_dir, exist_ok=True)
+
+    def get_blob_client(self, blob):
+        return LocalBlobClient(self.container_dir, self.tmp_dir, blob)
+
+    def list_blob_names(self):
+        return sorted(os.listdir(self.container_dir))
+
+
+# In-memory stand-ins. State lives in module globals, so it is only shared by
+# clients created in the same process.
+memory_lock = threading.Lock()
+memory_queues = {}
+memory_containers = {}
+
+
+class MemoryQueueClient:
+    def __init__(self, queue_name):
+        self.queue_name = queue_name
+        with memory_lock:
+            self.messages = memory_queues.setdefault(queue_name, [])
+
+    def send_message(self, content):
+        message_id = uuid.uuid4().hex
+        with memory_lock:
+            self.messages.append({'id': message_id, 'content': content, 'pop_receipt': None, 'visible_at': 0})
+        return QueueMessage(message_id, content, None)
+
+    def receive_messages(self, messages_per_page=None, visibility_timeout=None, max_messages=None):
+        if visibility_timeout is None:
+            visibility_timeout = DEFAULT_VISIBILITY_TIMEOUT
+        messages = []
+        now = time.monotonic()
+        with memory_lock:
+            for entry in self.messages:
+                if max_messages is not None and len(messages) >= max_messages:
+                    break
+                if entry['visible_at'] > now:
+                    continue
+                entry['visible_at'] = now + visibility_timeout
+                entry['pop_receipt'] = uuid.uuid4().hex
+                messages.append(QueueMessage(entry['id'], entry['content'], entry['pop_receipt']))
+        return messages
+
+    def delete_message(self, message, pop_receipt=None):
+        pop_receipt = pop_receipt or message.pop_receipt
+        with memory_lock:
+            for i, entry in enumerate(self.messages):
+                if entry['id'] == message.id and entry['pop_receipt'] == pop_receipt:
+                    del self.messages[i]
+                    return
+        raise KeyError(f"Message {message.id} not found in queue {self.queue_name}")
+
+
+class MemoryBlobClient:
+    def __init__(self, container_name, blobs, blob_name):
+        self.blob_name = blob_name
+        self.blobs = blobs
+        self.url = f"memory://{container_name}/{blob_name}"
+
+    def upload_blob(self, data, overwrite=False):
+        data = _read_data(data)
+        with memory_lock:
+            if not overwrite and self.blob_name in self.blobs:
+                raise FileExistsError(f"Blob {self.blob_name} already exists")
+            self.blobs[self.blob_name] = data
+
+    def download_blob(self):
+        with memory_lock:
+            if self.blob_name not in self.blobs:
+                raise FileNotFoundError(f"Blob {self.blob_name} not found")
+            return BlobDownloader(self.blobs[self.blob_name])
+
+
+class MemoryContainerClient:
+    def __init__(self, container_name):
+        self.container_name = container_name
+        with memory_lock:
+            self.blobs = memory_containers.setdefault(container_name, {})
+
+    def get_blob_client(self, blob):
+        return MemoryBlobClient(self.container_name, self.blobs, blob)
+
+    def list_blob_names(self):
+        with memory_lock:
+            return sorted(self.blobs)
+
+
+def get_queue_client(connection_string, queue_name):
+    if STORAGE_BACKEND == 'local':
+        return LocalQueueClient(LOCAL_STORAGE_DIR, queue_name)
+    if STORAGE_BACKEND == 'memory':
+        return MemoryQueueClient(queue_name)
+    # Imported here so the local backends work without the Azure SDK installed
+    from azure.storage.queue import QueueServiceClient
+    queue_service_client = QueueServiceClient.from_connection_string(connection_string)
+    return queue_service_client.get_queue_client(queue_name)
+
+
+def get_container_client(connection_string, container_name):
+    if STORAGE_BACKEND == 'local':
+        return LocalContainerClient(LOCAL_STORAGE_DIR, container_name)
+    if STORAGE_BACKEND == 'memory':
+        return MemoryContainerClient(container_name)
+    from azure.storage.blob import BlobServiceClient
+    blob_service_client = BlobServiceClient.from_connection_string(connection_string)
+    return blob_service_client.get_container_client(container_name)
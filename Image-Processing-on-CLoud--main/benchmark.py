@@ -0,0 +1,449 @@
+import argparse
+import json
+import logging
+import math
+import os
+import random
+import resource
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import cv2
+import numpy as np
+import requests
+
+# End-to-end benchmark: starts the Flask app, the master and N workers as local
+# processes backed by the filesystem storage stand-in (see backends.py), replays
+# a synthetic workload through /upload and reports throughput, latency and
+# resource usage. Example:
+#
+#   python3 benchmark.py --workers 4 --tasks 200 --kill-interval 15 --output bench.json
+#   python3 benchmark.py --workers 4 --tasks 200 --baseline bench.json --tolerance 0.1
+
+base_dir = os.path.dirname(os.path.abspath(__file__))
+
+# feature_matching is left out of the default mix: it needs a second image
+# name, which the upload form does not provide
+default_operations = 'canny_edge_detector,watershed_segmentation,face_detection'
+result_container_name = 'myresult'
+rss_sample_interval = 0.5
+
+# Flags that do not change the workload, so they may differ from a --baseline run
+report_only_args = {'output', 'baseline', 'tolerance', 'keep', 'master_port', 'app_port'}
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Benchmark the image processing pipeline with local storage.')
+    parser.add_argument('--workers', type=int, default=4, help='number of worker processes')
+    parser.add_argument('--tasks', type=int, default=100, help='number of tasks to submit')
+    parser.add_argument('--operations', default=default_operations, help='comma separated operations to mix')
+    parser.add_argument('--sizes', default='256,512,1024', help='comma separated image edge lengths in pixels')
+    parser.add_argument('--burst-size', type=int, default=10, help='tasks submitted back to back per burst')
+    parser.add_argument('--burst-interval', type=float, default=1.0, help='seconds between bursts')
+    parser.add_argument('--kill-interval', type=float, default=0, help='seconds between worker kills (0 disables)')
+    parser.add_argument('--restart-delay', type=float, default=2.0, help='seconds before a killed worker is restarted')
+    parser.add_argument('--fetch-interval', type=float, default=0.5, help='master queue polling interval')
+    parser.add_argument('--idle-interval', type=float, default=0.2, help='master wait between NO_TASK signals')
+    parser.add_argument('--poll-interval', type=float, default=0.1, help='result polling interval')
+    parser.add_argument('--timeout', type=float, default=600, help='seconds to wait for all tasks to finish')
+    parser.add_argument('--master-port', type=int, default=5100)
+    parser.add_argument('--app-port', type=int, default=5101)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='write the report as JSON to this file')
+    parser.add_argument('--baseline', help='JSON report from an earlier run to check for regressions against')
+    parser.add_argument('--tolerance', type=float, default=0.1,
+                        help='allowed relative slowdown against --baseline (0.1 = 10%%)')
+    parser.add_argument('--keep', action='store_true', help='keep the working directory and process logs')
+    return parser.parse_args()
+
+
+def make_image(size, rng):
+    # Noisy background with filled shapes so every operation has something to find
+    image = rng.integers(0, 64, (size, size, 3), dtype=np.uint8)
+    for _ in range(8):
+        color = tuple(int(c) for c in rng.integers(64, 256, 3))
+        center = tuple(int(c) for c in rng.integers(0, size, 2))
+        radius = int(rng.integers(size // 20 + 1, size // 5 + 2))
+        cv2.circle(image, center, radius, color, -1)
+    ok, encoded = cv2.imencode('.png', image)
+    if not ok:
+        raise RuntimeError(f"Failed to encode synthetic {size}x{size} image")
+    return encoded.tobytes()
+
+
+def make_workload(args):
+    operations = args.operations.split(',')
+    sizes = [int(size) for size in args.sizes.split(',')]
+    rng = random.Random(args.seed)
+    np_rng = np.random.default_rng(args.seed)
+    images = {size: make_image(size, np_rng) for size in sizes}
+    tasks = []
+    for i in range(args.tasks):
+        size = rng.choice(sizes)
+        tasks.append({'filename': f"bench_{i:06d}_{size}.png", 'operation': rng.choice(operations),
+                      'size': size, 'data': images[size]})
+    return tasks
+
+
+def start_process(name, cmd, work_dir, env, log_dir):
+    os.makedirs(work_dir, exist_ok=True)
+    log_file = open(os.path.join(log_dir, f"{name}.log"), 'ab')
+    # Each process gets its own session so killing its group also ends the
+    # img_processing.py runs a worker has started
+    proc = subprocess.Popen(cmd, cwd=work_dir, env=env, stdout=log_file, stderr=subprocess.STDOUT,
+                            start_new_session=True)
+    log_file.close()
+    logging.info(f"Started {name} (pid {proc.pid})")
+    return proc
+
+
+def signal_group(proc, sig):
+    try:
+        os.killpg(proc.pid, sig)
+    except ProcessLookupError:
+        pass
+
+
+def stop_process(proc, timeout=5):
+    if proc.poll() is None:
+        signal_group(proc, signal.SIGTERM)
+        try:
+            proc.wait(timeout)
+        except subprocess.TimeoutExpired:
+            pass
+    # Also catches children left behind after the process itself exited
+    signal_group(proc, signal.SIGKILL)
+    proc.wait()
+
+
+def wait_until(check, timeout, message):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if check():
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(message)
+
+
+def connected_workers(app_url):
+    statuses = requests.get(f"{app_url}/status", timeout=5).json()
+    return sum(entry['statuses'].count('connected') for entry in statuses)
+
+
+def submit_tasks(app_url, tasks, burst_size, burst_interval, submitted, upload_failed, stop_event):
+    for start in range(0, len(tasks), burst_size):
+        for task in tasks[start:start + burst_size]:
+            if stop_event.is_set():
+                return
+            name = task['filename']
+            submitted[name] = time.monotonic()
+            try:
+                response = requests.post(f"{app_url}/upload", data={'operation': task['operation']},
+                                         files={'file': (name, task['data'], 'image/png')},
+                                         allow_redirects=False, timeout=30)
+                error = None if response.status_code in (200, 302) else f"status {response.status_code}"
+            except requests.RequestException as e:
+                error = e
+            if error is not None:
+                # No result can arrive for this task, so stop expecting one
+                logging.error(f"Upload of {name} failed: {error}")
+                submitted.pop(name, None)
+                upload_failed[name] = time.monotonic()
+        stop_event.wait(burst_interval)
+
+
+def kill_workers(workers, workers_lock, start_worker, kill_interval, restart_delay, kills, stop_event):
+    rng = random.Random()
+    while not stop_event.wait(kill_interval):
+        with workers_lock:
+            index = rng.randrange(len(workers))
+            signal_group(workers[index], signal.SIGKILL)
+            workers[index].wait()
+        kills.append(time.monotonic())
+        logging.info(f"Killed worker {index}")
+        if stop_event.wait(restart_delay):
+            return
+        with workers_lock:
+            # The run may have been shut down while we were waiting
+            if stop_event.is_set():
+                return
+            workers[index] = start_worker(index)
+
+
+def group_rss_kb(pgids):
+    # Sum VmRSS over every live process in the given process groups (Linux /proc)
+    total = 0
+    for pid in os.listdir('/proc'):
+        if not pid.isdigit():
+            continue
+        try:
+            with open(f"/proc/{pid}/stat") as f:
+                # Fields after the parenthesised command: state, ppid, pgrp, ...
+                pgrp = int(f.read().rpartition(')')[2].split()[2])
+            if pgrp not in pgids:
+                continue
+            with open(f"/proc/{pid}/status") as f:
+                for line in f:
+                    if line.startswith('VmRSS:'):
+                        total += int(line.split()[1])
+                        break
+        except (OSError, ValueError, IndexError):
+            continue
+    return total
+
+
+def sample_rss(role_pgids, peaks, stop_event):
+    # Track the peak combined RSS of each role (app, master, workers and their children)
+    while not stop_event.is_set():
+        for role, pgids in role_pgids().items():
+            peaks[role] = max(peaks.get(role, 0), group_rss_kb(pgids))
+        stop_event.wait(rss_sample_interval)
+
+
+def workload_config(args):
+    return {key: value for key, value in sorted(vars(args).items()) if key not in report_only_args}
+
+
+def config_mismatches(config, baseline):
+    # Reports from different workloads are not comparable
+    baseline_config = baseline.get('config')
+    if baseline_config is None:
+        return ['baseline report has no config (written by an older benchmark.py)']
+    return [f"{key}: {config.get(key)!r} vs baseline {baseline_config.get(key)!r}"
+            for key in sorted(set(config) | set(baseline_config)) if config.get(key) != baseline_config.get(key)]
+
+
+def percentile(values, p):
+    if not values:
+        return None
+    # Nearest-rank percentile
+    values = sorted(values)
+    return values[max(0, math.ceil(p / 100 * len(values)) - 1)]
+
+
+def build_report(args, tasks, submitted, completed, failed, upload_failed, result_count, kills, rss_peaks,
+                 wall_time):
+    # Only successful tasks count towards throughput and latency
+    latencies = {name: completed[name] - submitted[name] for name in completed if name in submitted}
+    report = {
+        'config': workload_config(args),
+        'workers': args.workers,
+        'tasks_submitted': len(submitted),
+        'tasks_completed': len(latencies),
+        'tasks_failed': len(failed),
+        'uploads_failed': len(upload_failed),
+        'tasks_unfinished': len(tasks) - len(latencies) - len(failed) - len(upload_failed),
+        'results_stored': result_count,
+        'worker_kills': len(kills),
+        'wall_time_s': wall_time,
+        'tasks_per_s': len(latencies) / wall_time if wall_time > 0 else 0.0,
+        'latency_p50_s': percentile(latencies.values(), 50),
+        'latency_p99_s': percentile(latencies.values(), 99),
+        'latency_max_s': max(latencies.values(), default=None),
+        'by_operation': {},
+        'by_size': {},
+    }
+    for key, group in (('operation', 'by_operation'), ('size', 'by_size')):
+        for task in tasks:
+            if task['filename'] in latencies:
+                report[group].setdefault(str(task[key]), []).append(latencies[task['filename']])
+        report[group] = {name: {'count': len(values), 'p50_s': percentile(values, 50), 'p99_s': percentile(values, 99)}
+                         for name, values in sorted(report[group].items())}
+    # Covers reaped descendants only: the app, master, workers and the img_processing.py
+    # runs they waited for. Runs cut short by a worker kill are not included.
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    report['cpu_user_s'] = usage.ru_utime
+    report['cpu_system_s'] = usage.ru_stime
+    report['cpu_utilization'] = (usage.ru_utime + usage.ru_stime) / wall_time if wall_time > 0 else 0.0
+    # Peak of the largest single reaped process, not a sum; ru_maxrss is in KiB on Linux
+    report['largest_child_peak_rss_mb'] = usage.ru_maxrss / 1024
+    report['peak_rss_mb'] = {role: kb / 1024 for role, kb in sorted(rss_peaks.items())}
+    return report
+
+
+def print_report(report):
+    def fmt(value):
+        return '-' if value is None else f"{value:.3f}"
+    print(f"workers:          {report['workers']}")
+    print(f"tasks:            {report['tasks_completed']}/{report['tasks_submitted']} completed, "
+          f"{report['tasks_failed']} failed, {report['uploads_failed']} uploads failed, "
+          f"{report['results_stored']} results stored, "
+          f"{report['worker_kills']} worker kills")
+    print(f"wall time:        {fmt(report['wall_time_s'])} s")
+    print(f"throughput:       {fmt(report['tasks_per_s'])} tasks/s")
+    print(f"latency:          p50 {fmt(report['latency_p50_s'])} s, p99 {fmt(report['latency_p99_s'])} s, "
+          f"max {fmt(report['latency_max_s'])} s")
+    for group in ('by_operation', 'by_size'):
+        for name, stats in report[group].items():
+            print(f"  {name:<24} n={stats['count']:<5} p50 {fmt(stats['p50_s'])} s, p99 {fmt(stats['p99_s'])} s")
+    print(f"cpu:              user {fmt(report['cpu_user_s'])} s, system {fmt(report['cpu_system_s'])} s, "
+          f"utilization {fmt(report['cpu_utilization'])}")
+    print("peak rss:         " + ', '.join(f"{role} {mb:.1f} MB" for role, mb in report['peak_rss_mb'].items()))
+    print(f"largest process:  {report['largest_child_peak_rss_mb']:.1f} MB peak rss")
+
+
+def compare_to_baseline(report, baseline, tolerance):
+    mismatches = config_mismatches(report['config'], baseline)
+    if mismatches:
+        raise ValueError(f"Baseline was run with a different workload: {'; '.join(mismatches)}")
+    regressions = []
+    if report['tasks_per_s'] < baseline['tasks_per_s'] * (1 - tolerance):
+        regressions.append(f"throughput {report['tasks_per_s']:.3f} tasks/s vs baseline {baseline['tasks_per_s']:.3f}")
+    for key in ('latency_p50_s', 'latency_p99_s'):
+        if baseline.get(key) is None:
+            continue
+        if report[key] is None or report[key] > baseline[key] * (1 + tolerance):
+            value = '-' if report[key] is None else f"{report[key]:.3f}"
+            regressions.append(f"{key} {value} s vs baseline {baseline[key]:.3f} s")
+    # Failures are excluded from the figures above, so check them separately
+    failures = report['tasks_failed'] + report['tasks_unfinished']
+    baseline_failures = baseline.get('tasks_failed', 0) + baseline.get('tasks_unfinished', 0)
+    if failures > baseline_failures:
+        regressions.append(f"{failures} failed or unfinished tasks vs baseline {baseline_failures}")
+    return regressions
+
+
+def main():
+    args = parse_args()
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        # Check before running so a mismatched baseline does not cost a whole run
+        mismatches = config_mismatches(workload_config(args), baseline)
+        if mismatches:
+            for mismatch in mismatches:
+                logging.error(f"Workload differs from {args.baseline}: {mismatch}")
+            sys.exit(2)
+    tasks = make_workload(args)
+
+    work_dir = tempfile.mkdtemp(prefix='img-bench-')
+    log_dir = os.path.join(work_dir, 'logs')
+    os.makedirs(log_dir)
+    storage_dir = os.path.join(work_dir, 'storage')
+    app_url = f"http://127.0.0.1:{args.app_port}"
+    logging.info(f"Working directory: {work_dir}")
+
+    env = dict(os.environ, STORAGE_BACKEND='local', LOCAL_STORAGE_DIR=storage_dir, PYTHONPATH=base_dir,
+               MASTER_ADDRESS='127.0.0.1', MASTER_PORT=str(args.master_port), FLASK_URL=app_url)
+    master_env = dict(env, FETCH_INTERVAL=str(args.fetch_interval), IDLE_INTERVAL=str(args.idle_interval))
+    # Workers block on the socket anyway, so they need no extra wait after NO_TASK
+    worker_env = dict(env, IDLE_INTERVAL='0')
+
+    # The app's own queue fetch thread is not started: it would compete with the master for tasks
+    app_cmd = [sys.executable, '-c',
+               f"import App; App.app.run(host='127.0.0.1', port={args.app_port}, use_reloader=False)"]
+
+    def start_worker(index):
+        return start_process(f"worker{index}", [sys.executable, os.path.join(base_dir, 'Workers.py')],
+                             os.path.join(work_dir, f"worker{index}"), worker_env, log_dir)
+
+    app_proc = master_proc = None
+    workers = []
+    workers_lock = threading.Lock()
+    stop_event = threading.Event()
+    submitted = {}
+    completed = {}
+    failed = {}
+    upload_failed = {}
+    kills = []
+    rss_peaks = {}
+    submit_thread = None
+
+    def role_pgids():
+        # Every process leads its own session, so its pid is also its process group id
+        with workers_lock:
+            return {'app': {app_proc.pid}, 'master': {master_proc.pid},
+                    'workers': {worker.pid for worker in workers}}
+    try:
+        app_proc = start_process('app', app_cmd, os.path.join(work_dir, 'app'), env, log_dir)
+        wait_until(lambda: requests.get(f"{app_url}/status", timeout=5).ok, 30, "Flask app did not start")
+        master_proc = start_process('master', [sys.executable, os.path.join(base_dir, 'Master.py')],
+                                    os.path.join(work_dir, 'master'), master_env, log_dir)
+        with workers_lock:
+            workers.extend(start_worker(i) for i in range(args.workers))
+        wait_until(lambda: connected_workers(app_url) >= args.workers, 60, "Workers did not connect to the master")
+
+        rss_thread = threading.Thread(target=sample_rss, args=(role_pgids, rss_peaks, stop_event), daemon=True)
+        rss_thread.start()
+
+        start = time.monotonic()
+        submit_thread = threading.Thread(target=submit_tasks, args=(app_url, tasks, args.burst_size,
+                                                                    args.burst_interval, submitted, upload_failed,
+                                                                    stop_event))
+        submit_thread.start()
+        if args.kill_interval > 0:
+            kill_thread = threading.Thread(target=kill_workers, args=(workers, workers_lock, start_worker,
+                                                                      args.kill_interval, args.restart_delay,
+                                                                      kills, stop_event), daemon=True)
+            kill_thread.start()
+
+        deadline = start + args.timeout
+        while len(completed) + len(failed) + len(upload_failed) < len(tasks) and time.monotonic() < deadline:
+            try:
+                for result in requests.get(f"{app_url}/results_json", timeout=5).json():
+                    name = result['filename']
+                    if name not in submitted or name in completed or name in failed:
+                        continue
+                    # Workers report "ERROR" when img_processing.py exits non-zero
+                    if result['url'] in ('', 'ERROR'):
+                        failed[name] = time.monotonic()
+                    else:
+                        completed[name] = time.monotonic()
+            except requests.RequestException as e:
+                logging.error(f"Failed to poll results: {e}")
+            time.sleep(args.poll_interval)
+        unfinished = len(tasks) - len(completed) - len(failed) - len(upload_failed)
+        if unfinished:
+            logging.error(f"Timed out with {unfinished} tasks unfinished")
+        if failed or upload_failed:
+            logging.error(f"{len(failed)} tasks failed, {len(upload_failed)} uploads failed")
+        finished = list(completed.values()) + list(failed.values())
+        wall_time = (max(finished) if finished else time.monotonic()) - start
+    finally:
+        stop_event.set()
+        if submit_thread is not None:
+            submit_thread.join()
+        with workers_lock:
+            for worker in workers:
+                stop_process(worker)
+        # Stop the master before the app: it clears the app's state on shutdown
+        for proc in (master_proc, app_proc):
+            if proc is not None:
+                stop_process(proc)
+
+    result_dir = os.path.join(storage_dir, 'containers', result_container_name)
+    result_count = len(os.listdir(result_dir)) if os.path.isdir(result_dir) else 0
+    report = build_report(args, tasks, submitted, completed, failed, upload_failed, result_count,
+                          kills, rss_peaks, wall_time)
+    print_report(report)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        logging.info(f"Report written to {args.output}")
+    if args.keep:
+        logging.info(f"Logs and storage kept in {work_dir}")
+    else:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    if baseline is not None:
+        regressions = compare_to_baseline(report, baseline, args.tolerance)
+        for regression in regressions:
+            logging.error(f"Regression: {regression}")
+        if regressions:
+            sys.exit(1)
+        logging.info(f"No regressions against {args.baseline} (tolerance {args.tolerance:.0%})")
+
+
+if __name__ == '__main__':
+    main()
@@ -2,9 +2,9 @@ import sys
 import cv2
 import numpy as np
 import logging
-from azure.storage.blob import BlobServiceClient, BlobClient, ContainerClient
 import os
 import time
+import backends
 
 # Setup basic configuration for logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -12,9 +12,8 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(
 # Initialize Azure Blob Service Client
 connection_string = "DefaultEndpointsProtocol=https;AccountName=vm123store;AccountKey=LhRPPjDK4YLM6J0v4YABGxKv9vZoJW91+UcDNR+MOgQ33EYHJxJjrM76UkqhULe72/yAa8V/AkwG+AStgHuf3g==;EndpointSuffix=core.windows.net"
 
-blob_service_client = BlobServiceClient.from_connection_string(connection_string)
-image_container_client = blob_service_client.get_container_client("myone")  # Container for images
-result_container_client = blob_service_client.get_container_client("myresult")  # Container for res>
+image_container_client = backends.get_container_client(connection_string, "myone")  # Container for images
+result_container_client = backends.get_container_client(connection_string, "myresult")  # Container for res>
 
 def download_from_azure(blob_name, download_path):
     blob_client = image_container_client.get_blob_client(blob=blob_name)
@@ -46,7 +45,8 @@ def upload_to_azure(file_path, file_name, retries=3):
 def save_image(image, base_name):
     local_path = "./"
     unique_suffix = time.strftime("%Y%m%d-%H%M%S")
-    file_name = f"{base_name}_{unique_suffix}.jpg"
+    # Include the process id so concurrent workers never overwrite each other's results
+    file_name = f"{base_name}_{unique_suffix}_{os.getpid()}.jpg"
     file_path = os.path.join(local_path, file_name)
     try:
         cv2.imwrite(file_path, image)
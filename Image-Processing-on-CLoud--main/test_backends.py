@@ -0,0 +1,120 @@
+import io
+import threading
+import time
+
+import pytest
+
+import backends
+
+
+@pytest.fixture(params=['local', 'memory'])
+def clients(request, tmp_path):
+    backends.memory_queues.clear()
+    backends.memory_containers.clear()
+    if request.param == 'local':
+        return (lambda name: backends.LocalQueueClient(str(tmp_path), name),
+                lambda name: backends.LocalContainerClient(str(tmp_path), name))
+    return backends.MemoryQueueClient, backends.MemoryContainerClient
+
+
+def test_send_receive_delete(clients):
+    queue_client = clients[0]('taskqueue')
+    for i in range(3):
+        queue_client.send_message(f"image{i}.png,canny_edge_detector,url{i}")
+    messages = queue_client.receive_messages(messages_per_page=32)
+    assert [msg.content for msg in messages] == [f"image{i}.png,canny_edge_detector,url{i}" for i in range(3)]
+    for msg in messages:
+        queue_client.delete_message(msg)
+    assert queue_client.receive_messages(visibility_timeout=0) == []
+
+
+def test_received_message_is_hidden_until_visibility_timeout(clients):
+    queue_client = clients[0]('taskqueue')
+    queue_client.send_message('task')
+    first = queue_client.receive_messages(visibility_timeout=0.2)
+    assert len(first) == 1
+    assert queue_client.receive_messages() == []
+    time.sleep(0.3)
+    second = queue_client.receive_messages()
+    assert [msg.content for msg in second] == ['task']
+    # The first pop receipt is stale once the message has been received again
+    with pytest.raises((FileNotFoundError, KeyError)):
+        queue_client.delete_message(first[0])
+    queue_client.delete_message(second[0])
+    assert queue_client.receive_messages(visibility_timeout=0) == []
+
+
+def test_concurrent_receivers_never_share_a_message(clients):
+    make_queue_client = clients[0]
+    make_queue_client('taskqueue')
+    for i in range(200):
+        make_queue_client('taskqueue').send_message(str(i))
+    received = []
+    received_lock = threading.Lock()
+
+    def receive():
+        queue_client = make_queue_client('taskqueue')
+        while True:
+            messages = queue_client.receive_messages(max_messages=5)
+            if not messages:
+                return
+            with received_lock:
+                received.extend(msg.content for msg in messages)
+
+    threads = [threading.Thread(target=receive) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(received, key=int) == [str(i) for i in range(200)]
+
+
+def test_blob_upload_and_download(clients):
+    container_client = clients[1]('myone')
+    container_client.get_blob_client('a.png').upload_blob(io.BytesIO(b'first'), overwrite=True)
+    assert container_client.get_blob_client(blob='a.png').download_blob().readall() == b'first'
+    assert container_client.list_blob_names() == ['a.png']
+
+    with pytest.raises(FileExistsError):
+        container_client.get_blob_client('a.png').upload_blob(b'second')
+    container_client.get_blob_client('a.png').upload_blob(b'second', overwrite=True)
+    assert container_client.get_blob_client('a.png').download_blob().readall() == b'second'
+
+
+def test_download_missing_blob_fails(clients):
+    with pytest.raises(FileNotFoundError):
+        clients[1]('myone').get_blob_client('missing.png').download_blob()
+
+
+def test_local_blob_name_cannot_escape_container(tmp_path):
+    container_client = backends.LocalContainerClient(str(tmp_path), 'myone')
+    with pytest.raises(ValueError):
+        container_client.get_blob_client('../../escape.png')
+
+
+def test_concurrent_receivers_survive_expired_claims(clients):
+    make_queue_client = clients[0]
+    for i in range(50):
+        make_queue_client('taskqueue').send_message(str(i))
+    received = set()
+    errors = []
+    received_lock = threading.Lock()
+
+    def receive():
+        queue_client = make_queue_client('taskqueue')
+        try:
+            for _ in range(20):
+                # Claims expire immediately, so receivers keep racing on the same messages
+                messages = queue_client.receive_messages(visibility_timeout=0)
+                with received_lock:
+                    received.update(msg.content for msg in messages)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=receive) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert received == {str(i) for i in range(50)}
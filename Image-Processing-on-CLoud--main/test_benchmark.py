@@ -0,0 +1,103 @@
+import argparse
+
+import pytest
+
+# benchmark.py imports these at module level to build and upload its workload
+pytest.importorskip('cv2')
+pytest.importorskip('numpy')
+pytest.importorskip('requests')
+
+import benchmark
+
+
+def make_args(**overrides):
+    args = dict(workers=2, tasks=5, operations='canny_edge_detector,face_detection', sizes='256',
+                burst_size=10, burst_interval=1.0, kill_interval=0, restart_delay=2.0, fetch_interval=0.5,
+                idle_interval=0.2, poll_interval=0.1, timeout=600, master_port=5100, app_port=5101, seed=0,
+                output=None, baseline=None, tolerance=0.1, keep=False)
+    args.update(overrides)
+    return argparse.Namespace(**args)
+
+
+def make_report(**overrides):
+    report = {'config': benchmark.workload_config(make_args()), 'tasks_per_s': 2.0, 'latency_p50_s': 1.0,
+              'latency_p99_s': 3.0, 'tasks_failed': 0, 'tasks_unfinished': 0}
+    report.update(overrides)
+    return report
+
+
+def test_percentile_nearest_rank():
+    assert benchmark.percentile([], 50) is None
+    assert benchmark.percentile([5.0], 50) == 5.0
+    assert benchmark.percentile([5.0], 99) == 5.0
+    assert benchmark.percentile([4, 1, 3, 2], 50) == 2
+    assert benchmark.percentile([4, 1, 3, 2], 99) == 4
+    assert benchmark.percentile(range(1, 101), 50) == 50
+    assert benchmark.percentile(range(1, 101), 99) == 99
+
+
+def test_build_report_excludes_failures_from_throughput_and_latency():
+    tasks = [{'filename': name, 'operation': op, 'size': 256}
+             for name, op in (('a', 'canny_edge_detector'), ('b', 'face_detection'), ('c', 'canny_edge_detector'),
+                              ('d', 'canny_edge_detector'), ('e', 'face_detection'))]
+    # e's upload failed, so it was never submitted; c failed and d never finished
+    submitted = {'a': 0.0, 'b': 0.0, 'c': 0.0, 'd': 0.0}
+    completed = {'a': 1.0, 'b': 3.0}
+    failed = {'c': 0.5}
+    upload_failed = {'e': 0.0}
+    report = benchmark.build_report(make_args(), tasks, submitted, completed, failed, upload_failed,
+                                    result_count=2, kills=[], rss_peaks={'app': 2048}, wall_time=4.0)
+    assert report['tasks_submitted'] == 4
+    assert report['tasks_completed'] == 2
+    assert report['tasks_failed'] == 1
+    assert report['uploads_failed'] == 1
+    assert report['tasks_unfinished'] == 1
+    assert report['tasks_per_s'] == 0.5
+    assert report['latency_p50_s'] == 1.0
+    assert report['latency_p99_s'] == 3.0
+    assert report['by_operation'] == {'canny_edge_detector': {'count': 1, 'p50_s': 1.0, 'p99_s': 1.0},
+                                      'face_detection': {'count': 1, 'p50_s': 3.0, 'p99_s': 3.0}}
+    assert report['peak_rss_mb'] == {'app': 2.0}
+    assert 'output' not in report['config'] and report['config']['tasks'] == 5
+
+
+def test_compare_to_baseline_passes_within_tolerance():
+    baseline = make_report()
+    assert benchmark.compare_to_baseline(make_report(tasks_per_s=1.85, latency_p99_s=3.25), baseline, 0.1) == []
+
+
+def test_compare_to_baseline_flags_throughput_drop():
+    regressions = benchmark.compare_to_baseline(make_report(tasks_per_s=1.7), make_report(), 0.1)
+    assert len(regressions) == 1 and regressions[0].startswith('throughput')
+
+
+def test_compare_to_baseline_flags_latency_rise():
+    regressions = benchmark.compare_to_baseline(make_report(latency_p50_s=1.2, latency_p99_s=3.5), make_report(), 0.1)
+    assert [r.split()[0] for r in regressions] == ['latency_p50_s', 'latency_p99_s']
+
+
+def test_compare_to_baseline_handles_missing_latencies():
+    # No completions in this run is a regression; no completions in the baseline gives nothing to compare
+    no_completions = make_report(tasks_per_s=0.0, latency_p50_s=None, latency_p99_s=None, tasks_unfinished=5)
+    regressions = benchmark.compare_to_baseline(no_completions, make_report(), 0.1)
+    assert [r.split()[0] for r in regressions] == ['throughput', 'latency_p50_s', 'latency_p99_s', '5']
+    assert benchmark.compare_to_baseline(make_report(), no_completions, 0.1) == []
+
+
+def test_compare_to_baseline_flags_more_failures():
+    regressions = benchmark.compare_to_baseline(make_report(tasks_failed=1), make_report(), 0.1)
+    assert regressions == ['1 failed or unfinished tasks vs baseline 0']
+
+
+def test_compare_to_baseline_refuses_different_workloads():
+    baseline = make_report(config=benchmark.workload_config(make_args(tasks=50)))
+    with pytest.raises(ValueError, match='tasks'):
+        benchmark.compare_to_baseline(make_report(), baseline, 0.1)
+    baseline.pop('config')
+    with pytest.raises(ValueError, match='no config'):
+        benchmark.compare_to_baseline(make_report(), baseline, 0.1)
+
+
+def test_workload_config_ignores_output_only_flags():
+    assert benchmark.workload_config(make_args(output='a.json', app_port=6000, tolerance=0.5)) == \
+        benchmark.workload_config(make_args())